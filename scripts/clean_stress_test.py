@@ -4,38 +4,115 @@ Clean Stress Test for Rock 5B+
 Shows only real hardware readings - no estimations
 """
 
-import time
 import threading
 import subprocess
 import os
 import signal
 import sys
+import functools
+import multiprocessing
 from datetime import datetime
 
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+def _burn(iterations):
+    """CPU stress kernel - chained floating point multiply/add loop"""
+    result = 0.0
+    for i in range(iterations):
+        # Each step depends on the previous result, so an optimising JIT
+        # cannot fold the loop into a closed-form sum or drop it. Do not
+        # simplify: this arithmetic is the stress workload itself
+        result = result * 0.9999999 + i * 3.14159e-7
+    return result
+
+# JIT-compile the kernel when numba is available: the loop then runs as
+# native code and releases the GIL, so every stress thread loads a core
+if njit is not None:
+    _burn = njit(nogil=True, fastmath=True, cache=True)(_burn)
+
+# RK3588 enumerates the Cortex-A76 big cores as CPUs 4-7; the remaining
+# stress workers go onto the A55 cluster
+STRESS_CPUS = [4, 5, 6, 7, 0, 1]
+
+def cpu_stress_worker(worker_id, cpu, stop_event):
+    """CPU stress process - maximum intensity, pinned to one core"""
+    # Ctrl+C is handled by the parent, which sets stop_event
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    try:
+        os.sched_setaffinity(0, {cpu})
+    except OSError:
+        pass  # Core not present, leave placement to the scheduler
+    print(f"Starting CPU stress process {worker_id} on CPU {cpu}")
+    while not stop_event.is_set():
+        # Maximum CPU stress - no delays
+        _burn(20000000)  # 20M iterations
+    print(f"CPU stress process {worker_id} stopped")
+
 class CleanStressTest:
     def __init__(self):
-        self.running = True
-        self.cpu_threads = []
+        self.stop_event = multiprocessing.Event()
+        self.cpu_processes = []
         self.gpu_process = None
+        self.monitor_thread = None
         
-    def cpu_stress(self, thread_id):
-        """CPU stress function - maximum intensity"""
-        print(f"Starting CPU stress thread {thread_id}")
-        while self.running:
-            # Maximum CPU stress - no delays
-            result = 0
-            for i in range(20000000):  # 20M iterations
-                result += i * i * 3.14159
-        print(f"CPU stress thread {thread_id} stopped")
+        # Compile the stress kernel up front so JIT time is not spent
+        # inside the timed test
+        _burn(1)
+        
+        # Sensor files are opened once and re-read from offset 0 on every
+        # sample instead of being reopened each tick
+        self.stat_fd = self.open_sensor('/proc/stat')
+        self.meminfo_fd = self.open_sensor('/proc/meminfo')
+        self.temp_fd = self.open_sensor('/sys/class/thermal/thermal_zone0/temp')
+        # The GPU devfreq node name depends on the kernel, resolve it once
+        self.gpu_load_fd = self.open_first_sensor('/sys/class/devfreq/fb000000.gpu-mali/load',
+                                                  '/sys/class/devfreq/fb000000.gpu/load')
+        self.usbc_current_fd = self.open_sensor('/sys/class/power_supply/tcpm-source-psy-4-0022/current_now')
+        self.usbc_voltage_fd = self.open_sensor('/sys/class/power_supply/tcpm-source-psy-4-0022/voltage_now')
+        self.hwmon_current_fd = self.open_sensor('/sys/class/hwmon/hwmon7/curr1_input')
+        self.hwmon_voltage_fd = self.open_sensor('/sys/class/hwmon/hwmon7/in0_input')
+        self.regulator_fd = self.open_sensor('/sys/kernel/debug/regulator/regulator_summary')
+        
+        # The available power sensor does not change at runtime, so pick
+        # it once instead of falling through failing reads every sample
+        self.read_power = self.find_power_reader()
+    
+    def open_sensor(self, path):
+        """Open a sensor file for repeated reads, -1 if unavailable"""
+        try:
+            return os.open(path, os.O_RDONLY)
+        except OSError:
+            return -1
     
+    def open_first_sensor(self, *paths):
+        """Open the first available sensor file of paths, -1 if none is"""
+        for path in paths:
+            fd = self.open_sensor(path)
+            if fd >= 0:
+                return fd
+        return -1
+    
+    def read_sensor(self, fd, size=64):
+        """Re-read a cached sensor file from the start"""
+        return os.pread(fd, size, 0)
+    
+    def close_sensors(self):
+        """Close all cached sensor file descriptors"""
+        for name, fd in list(vars(self).items()):
+            if name.endswith('_fd') and fd >= 0:
+                os.close(fd)
+                setattr(self, name, -1)
+        
     def get_cpu_percentage(self):
         """Get CPU usage percentage from /proc/stat"""
         try:
-            with open('/proc/stat', 'r') as f:
-                lines = f.readlines()
-            
-            cpu_line = lines[0].split()[1:]
-            cpu_times = [int(x) for x in cpu_line]
+            # Only the aggregate "cpu" line is needed, which sits at the
+            # start of the file
+            raw = self.read_sensor(self.stat_fd, 256)
+            cpu_times = [int(x) for x in raw[:raw.index(b'\n')].split()[1:]]
             
             total_time = sum(cpu_times)
             idle_time = cpu_times[3]
@@ -61,86 +138,97 @@ class CleanStressTest:
         except Exception as e:
             return 0.0
     
+    def get_meminfo_value(self, raw, key):
+        """Extract a kB value for key (e.g. b'MemTotal:') from raw meminfo bytes"""
+        start = raw.index(key) + len(key)
+        return int(raw[start:raw.index(b'kB', start)])
+    
+    def get_memory_percentage(self):
+        """Get memory usage percentage from /proc/meminfo"""
+        # MemTotal and MemFree are the first two lines of meminfo
+        raw = self.read_sensor(self.meminfo_fd, 256)
+        total_mem = self.get_meminfo_value(raw, b'MemTotal:')
+        free_mem = self.get_meminfo_value(raw, b'MemFree:')
+        used_mem = total_mem - free_mem
+        return (used_mem / total_mem) * 100
+    
     def get_gpu_load(self):
         """Get real GPU load from hardware"""
+        if self.gpu_load_fd < 0:
+            return 0
         try:
-            # Try Mali GPU load
-            with open('/sys/class/devfreq/fb000000.gpu-mali/load', 'r') as f:
-                gpu_load = int(f.read().strip())
-                return gpu_load
-        except:
+            return int(self.read_sensor(self.gpu_load_fd))
+        except (OSError, ValueError):
+            return 0
+    
+    def read_sensor_pair(self, current_fd, voltage_fd, scale, source):
+        """Read a current/voltage sensor pair scaled to A and V"""
+        current = int(self.read_sensor(current_fd)) / scale
+        voltage = int(self.read_sensor(voltage_fd)) / scale
+        return {
+            'voltage_input': voltage,
+            'current_input': current,
+            'power_input': voltage * current,
+            'power_source': source
+        }
+    
+    def read_regulator_summary(self):
+        """Read input power from the regulator summary, None if not listed"""
+        summary = self.read_sensor(self.regulator_fd, 65536).decode()
+        for line in summary.split('\n'):
+            if 'vcc_5v' in line or 'vcc_12v' in line:
+                parts = line.split()
+                if len(parts) >= 7:
+                    try:
+                        voltage = float(parts[5]) / 1000.0
+                        current = float(parts[6]) / 1000.0
+                        if voltage > 0:
+                            return {
+                                'voltage_input': voltage,
+                                'current_input': current,
+                                'power_input': voltage * current,
+                                'power_source': 'Regulator'
+                            }
+                    except (ValueError, IndexError):
+                        continue
+        return None
+    
+    def find_power_reader(self):
+        """Probe the power sensors once and return a reader for the first working one"""
+        candidates = [
+            # USB-C power supply (most accurate), μA/μV
+            functools.partial(self.read_sensor_pair, self.usbc_current_fd, self.usbc_voltage_fd,
+                              1000000.0, 'USB-C Power Supply'),
+            # hwmon7 sensor, mA/mV
+            functools.partial(self.read_sensor_pair, self.hwmon_current_fd, self.hwmon_voltage_fd,
+                              1000.0, 'hwmon7 Sensor'),
+            self.read_regulator_summary,
+        ]
+        for reader in candidates:
             try:
-                # Try alternative GPU load path
-                with open('/sys/class/devfreq/fb000000.gpu/load', 'r') as f:
-                    gpu_load = int(f.read().strip())
-                    return gpu_load
-            except:
-                return 0
+                if reader() is not None:
+                    return reader
+            except (OSError, ValueError):
+                continue
+        return None
     
     def get_real_power_readings(self):
         """Get real power readings from hardware sensors only"""
-        power_info = {
-            'voltage_input': 0,
-            'current_input': 0,
-            'power_input': 0,
-            'power_source': 'No Sensor'
-        }
+        power_info = None
         
-        try:
-            # Try USB-C power supply (most accurate)
+        if self.read_power is not None:
             try:
-                with open('/sys/class/power_supply/tcpm-source-psy-4-0022/current_now', 'r') as f:
-                    current_ua = int(f.read().strip())
-                    power_info['current_input'] = current_ua / 1000000.0  # μA to A
-                
-                with open('/sys/class/power_supply/tcpm-source-psy-4-0022/voltage_now', 'r') as f:
-                    voltage_uv = int(f.read().strip())
-                    power_info['voltage_input'] = voltage_uv / 1000000.0  # μV to V
-                
-                power_info['power_input'] = power_info['voltage_input'] * power_info['current_input']
-                power_info['power_source'] = 'USB-C Power Supply'
-                
-            except:
-                # Try hwmon7 sensor
-                try:
-                    with open('/sys/class/hwmon/hwmon7/curr1_input', 'r') as f:
-                        current_ma = int(f.read().strip())
-                        power_info['current_input'] = current_ma / 1000.0  # mA to A
-                    
-                    with open('/sys/class/hwmon/hwmon7/in0_input', 'r') as f:
-                        voltage_mv = int(f.read().strip())
-                        power_info['voltage_input'] = voltage_mv / 1000.0  # mV to V
-                    
-                    power_info['power_input'] = power_info['voltage_input'] * power_info['current_input']
-                    power_info['power_source'] = 'hwmon7 Sensor'
-                    
-                except:
-                    # Try regulator summary
-                    try:
-                        result = subprocess.run(['cat', '/sys/kernel/debug/regulator/regulator_summary'], 
-                                              capture_output=True, text=True, timeout=5)
-                        if result.returncode == 0:
-                            lines = result.stdout.split('\n')
-                            for line in lines:
-                                if 'vcc_5v' in line or 'vcc_12v' in line:
-                                    parts = line.split()
-                                    if len(parts) >= 7:
-                                        try:
-                                            voltage = float(parts[5]) / 1000.0
-                                            current = float(parts[6]) / 1000.0
-                                            if voltage > 0:
-                                                power_info['voltage_input'] = voltage
-                                                power_info['current_input'] = current
-                                                power_info['power_input'] = voltage * current
-                                                power_info['power_source'] = 'Regulator'
-                                                break
-                                        except (ValueError, IndexError):
-                                            continue
-                    except:
-                        pass
-                
-        except Exception as e:
-            print(f"Power reading error: {e}")
+                power_info = self.read_power()
+            except Exception as e:
+                print(f"Power reading error: {e}")
+        
+        if power_info is None:
+            power_info = {
+                'voltage_input': 0,
+                'current_input': 0,
+                'power_input': 0,
+                'power_source': 'No Sensor'
+            }
         
         return power_info
     
@@ -148,8 +236,11 @@ class CleanStressTest:
         """GPU stress using glmark2"""
         print("Starting GPU stress (glmark2)")
         try:
+            # Own session: the terminal's Ctrl+C does not hit glmark2 mid-frame,
+            # and stop_stress can signal its whole process group at once
             self.gpu_process = subprocess.Popen(['glmark2', '--duration', '60', '--fullscreen'], 
-                                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+                                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                                              start_new_session=True)
             print("GPU stress using glmark2")
         except Exception as e:
             print(f"GPU stress failed: {e}")
@@ -157,7 +248,7 @@ class CleanStressTest:
     def monitor_system(self):
         """Monitor system resources with real hardware readings only"""
         print("Starting system monitoring")
-        while self.running:
+        while not self.stop_event.is_set():
             try:
                 # Get CPU percentage
                 cpu_percent = self.get_cpu_percentage()
@@ -166,17 +257,11 @@ class CleanStressTest:
                 gpu_load = self.get_gpu_load()
                 
                 # Get memory usage
-                with open('/proc/meminfo', 'r') as f:
-                    lines = f.readlines()
-                    total_mem = int(lines[0].split()[1])
-                    free_mem = int(lines[1].split()[1])
-                    used_mem = total_mem - free_mem
-                    mem_percent = (used_mem / total_mem) * 100
+                mem_percent = self.get_memory_percentage()
                 
                 # Get temperature
                 try:
-                    with open('/sys/class/thermal/thermal_zone0/temp', 'r') as f:
-                        temp = int(f.read().strip()) / 1000
+                    temp = int(self.read_sensor(self.temp_fd)) / 1000
                 except:
                     temp = 0
                 
@@ -194,25 +279,28 @@ class CleanStressTest:
                       f"{power_info['power_input']:.2f}W "
                       f"({power_info['power_source']})")
                 
-                time.sleep(5)
-                
             except Exception as e:
                 print(f"Monitoring error: {e}")
-                time.sleep(5)
+            
+            # Wakes immediately when the test is stopped
+            self.stop_event.wait(5)
     
     def start_stress(self, duration=300):
         """Start the stress test"""
         print(f"🚀 Starting Clean Stress Test (Duration: {duration}s)")
         print("=" * 50)
         print("📊 Real Hardware Readings Only - No Estimations")
+        print("⚙️  CPU kernel:", "numba (native, GIL released)" if njit else "pure Python")
         print("=" * 50)
         
-        # Start CPU stress threads (6 threads for maximum load)
-        for i in range(6):
-            thread = threading.Thread(target=self.cpu_stress, args=(i+1,))
-            thread.daemon = True
-            thread.start()
-            self.cpu_threads.append(thread)
+        # Start CPU stress processes (6 processes for maximum load), one
+        # per core so they are not serialised by the GIL
+        for i, cpu in enumerate(STRESS_CPUS):
+            process = multiprocessing.Process(target=cpu_stress_worker,
+                                              args=(i+1, cpu, self.stop_event))
+            process.daemon = True
+            process.start()
+            self.cpu_processes.append(process)
         
         # Start GPU stress
         gpu_thread = threading.Thread(target=self.gpu_stress)
@@ -220,9 +308,9 @@ class CleanStressTest:
         gpu_thread.start()
         
         # Start monitoring
-        monitor_thread = threading.Thread(target=self.monitor_system)
-        monitor_thread.daemon = True
-        monitor_thread.start()
+        self.monitor_thread = threading.Thread(target=self.monitor_system)
+        self.monitor_thread.daemon = True
+        self.monitor_thread.start()
         
         print("✅ All stress components started")
         print("📊 Monitoring real hardware sensors...")
@@ -231,7 +319,8 @@ class CleanStressTest:
         print("=" * 50)
         
         try:
-            time.sleep(duration)
+            # Returns early if the stop event is set
+            self.stop_event.wait(duration)
         except KeyboardInterrupt:
             print("\n⚠️  Stopping stress test...")
         
@@ -240,19 +329,27 @@ class CleanStressTest:
     def stop_stress(self):
         """Stop the stress test"""
         print("🛑 Stopping stress test...")
-        self.running = False
+        self.stop_event.set()
         
         # Stop GPU process
         if self.gpu_process:
             try:
-                self.gpu_process.terminate()
-                self.gpu_process.wait(timeout=5)
-            except:
-                self.gpu_process.kill()
+                os.killpg(self.gpu_process.pid, signal.SIGTERM)
+                self.gpu_process.wait(timeout=1)
+            except ProcessLookupError:
+                pass  # Already exited
+            except subprocess.TimeoutExpired:
+                os.killpg(self.gpu_process.pid, signal.SIGKILL)
+                self.gpu_process.wait()
         
-        # Wait for threads to finish
-        for thread in self.cpu_threads:
-            thread.join(timeout=2)
+        # Wait for CPU stress processes to finish
+        for process in self.cpu_processes:
+            process.join(timeout=2)
+            if process.is_alive():
+                process.terminate()
+        
+        if self.monitor_thread:
+            self.monitor_thread.join(timeout=2)
         
         print("✅ Stress test stopped")
         print("📊 Final system status:")
@@ -267,17 +364,11 @@ class CleanStressTest:
             gpu_load = self.get_gpu_load()
             print(f"   GPU Load: {gpu_load}%")
             
-            with open('/proc/meminfo', 'r') as f:
-                lines = f.readlines()
-                total_mem = int(lines[0].split()[1])
-                free_mem = int(lines[1].split()[1])
-                used_mem = total_mem - free_mem
-                mem_percent = (used_mem / total_mem) * 100
-                print(f"   Memory Usage: {mem_percent:.1f}%")
+            mem_percent = self.get_memory_percentage()
+            print(f"   Memory Usage: {mem_percent:.1f}%")
             
-            with open('/sys/class/thermal/thermal_zone0/temp', 'r') as f:
-                temp = int(f.read().strip()) / 1000
-                print(f"   Temperature: {temp:.1f}°C")
+            temp = int(self.read_sensor(self.temp_fd)) / 1000
+            print(f"   Temperature: {temp:.1f}°C")
             
             # Show final power status
             power_info = self.get_real_power_readings()
@@ -288,11 +379,14 @@ class CleanStressTest:
                 
         except Exception as e:
             print(f"   Error reading final status: {e}")
+        
+        self.close_sensors()
 
 def signal_handler(signum, frame):
     """Handle Ctrl+C"""
     print("\n⚠️  Received interrupt signal")
-    sys.exit(0)
+    # Let start_stress() catch it and shut down through stop_stress()
+    raise KeyboardInterrupt
 
 if __name__ == "__main__":
     # Set up signal handler
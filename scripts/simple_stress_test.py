@@ -10,120 +10,217 @@ import subprocess
 import os
 import signal
 import sys
-from datetime import datetime
+import multiprocessing
+import array
+import csv
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+try:
+    import pyopencl as cl
+    import numpy as np
+except ImportError:
+    cl = None
+
+def _burn(iterations):
+    """CPU stress kernel - chained floating point multiply/add loop"""
+    result = 0.0
+    for i in range(iterations):
+        # Each step depends on the previous result, so an optimising JIT
+        # cannot fold the loop into a closed-form sum or drop it. Do not
+        # simplify: this arithmetic is the stress workload itself
+        result = result * 0.9999999 + i * 3.14159e-7
+    return result
+
+# JIT-compile the kernel when numba is available: the loop then runs as
+# native floating point code instead of interpreter bytecode
+if njit is not None:
+    _burn = njit(nogil=True, fastmath=True, cache=True)(_burn)
+
+# Simple OpenCL test program for the GPU fallback
+KERNEL_SRC = """
+__kernel void stress_test(__global float* output) {
+    int gid = get_global_id(0);
+    float x = (float)gid;
+    float result = 0.0f;
+    
+    for(int i = 0; i < 1000; i++) {
+        result += sin(x + i) * cos(x - i);
+    }
+    output[gid] = result;
+}
+"""
+
+# RK3588 enumerates the Cortex-A76 big cores as CPUs 4-7, one per
+# stress worker
+STRESS_CPUS = [4, 5, 6, 7]
+
+def cpu_stress_worker(worker_id, cpu, stop_event):
+    """CPU stress process - mathematical calculations, pinned to one core"""
+    # Ctrl+C is handled by the parent, which sets stop_event
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    try:
+        os.sched_setaffinity(0, {cpu})
+    except OSError:
+        pass  # Core not present, leave placement to the scheduler
+    print(f"Starting CPU stress process {worker_id} on CPU {cpu}")
+    while not stop_event.is_set():
+        # Very intensive mathematical calculations to stress CPU
+        _burn(10000000)  # 10M iterations for maximum stress
+    print(f"CPU stress process {worker_id} stopped")
+
+# Monitor samples are kept column-wise, one typed array per metric. The
+# metrics have a small range, so they are stored as int16 fixed point
+# (value * scale); only the timestamp needs a double
+SAMPLE_SCALES = {'cpu': 100, 'gpu': 100, 'mem': 100, 'temp': 10,
+                 'voltage': 1000, 'current': 1000, 'power': 100}
+SAMPLE_COLUMNS = ('time',) + tuple(SAMPLE_SCALES)
+SAMPLES_CSV = '/tmp/simple_stress_samples.csv'
+
+# Monitor cadence: back off towards MAX while CPU and GPU load hold
+# steady, drop to MIN as soon as either moves by STEADY_DELTA or more
+MONITOR_INTERVAL = 5.0
+MONITOR_MIN_INTERVAL = 1.0
+MONITOR_MAX_INTERVAL = 30.0
+MONITOR_STEADY_DELTA = 2.0
+
+# Per-tick status line, filled with a single %-format
+MONITOR_LINE = ("[%s] CPU: %.1f%% | GPU: %d%% | RAM: %.1f%% | Temp: %.1f°C | "
+                "Power: %.2fV, %.3fA, %.2fW (%s)")
 
 class SimpleStressTest:
     def __init__(self):
-        self.running = True
-        self.cpu_threads = []
+        self.stop_event = multiprocessing.Event()
+        self.cpu_processes = []
         self.gpu_process = None
+        self.monitor_thread = None
+        self.monitor_interval = MONITOR_INTERVAL
+        self.prev_cpu_percent = 0.0
+        self.prev_gpu_load = 0
+        self.samples = {name: array.array('d' if name == 'time' else 'h')
+                        for name in SAMPLE_COLUMNS}
         
-    def cpu_stress(self, thread_id):
-        """CPU stress function - mathematical calculations"""
-        print(f"Starting CPU stress thread {thread_id}")
-        while self.running:
-            # Very intensive mathematical calculations to stress CPU
-            result = 0
-            for i in range(10000000):  # 10M iterations for maximum stress
-                result += i * i * 3.14159
-                # No delays - maximum CPU usage
-        print(f"CPU stress thread {thread_id} stopped")
+        # Compile the stress kernel up front so JIT time is not spent
+        # inside the timed test
+        _burn(1)
+        
+        # Sensor files are opened once and re-read from offset 0 on every
+        # sample instead of being reopened each tick
+        self.stat_fd = self.open_sensor('/proc/stat')
+        self.meminfo_fd = self.open_sensor('/proc/meminfo')
+        self.temp_fd = self.open_sensor('/sys/class/thermal/thermal_zone0/temp')
+        # The GPU devfreq node name depends on the kernel, resolve it once
+        self.gpu_load_fd = self.open_first_sensor('/sys/class/devfreq/fb000000.gpu-mali/load',
+                                                  '/sys/class/devfreq/fb000000.gpu/load')
+        self.voltage_fd = self.open_sensor('/sys/class/power_supply/tcpm-source-psy-4-0022/voltage_now')
+    
+    def open_sensor(self, path):
+        """Open a sensor file for repeated reads, -1 if unavailable"""
+        try:
+            return os.open(path, os.O_RDONLY)
+        except OSError:
+            return -1
     
+    def open_first_sensor(self, *paths):
+        """Open the first available sensor file of paths, -1 if none is"""
+        for path in paths:
+            fd = self.open_sensor(path)
+            if fd >= 0:
+                return fd
+        return -1
+    
+    def read_sensor(self, fd, size=64):
+        """Re-read a cached sensor file from the start"""
+        return os.pread(fd, size, 0)
+    
+    def close_sensors(self):
+        """Close all cached sensor file descriptors"""
+        for name, fd in list(vars(self).items()):
+            if name.endswith('_fd') and fd >= 0:
+                os.close(fd)
+                setattr(self, name, -1)
+        
     def get_gpu_load(self):
         """Get GPU load percentage"""
+        if self.gpu_load_fd < 0:
+            return 0
         try:
-            # Try Mali GPU load
-            with open('/sys/class/devfreq/fb000000.gpu-mali/load', 'r') as f:
-                gpu_load = int(f.read().strip())
-                return gpu_load
-        except:
-            try:
-                # Try alternative GPU load path
-                with open('/sys/class/devfreq/fb000000.gpu/load', 'r') as f:
-                    gpu_load = int(f.read().strip())
-                    return gpu_load
-            except:
-                return 0
+            return int(self.read_sensor(self.gpu_load_fd))
+        except (OSError, ValueError):
+            return 0
     
     def gpu_stress(self):
         """GPU stress using glmark2"""
         print("Starting GPU stress (glmark2)")
         try:
             # Run glmark2 in background
+            # Own session: the terminal's Ctrl+C does not hit glmark2 mid-frame,
+            # and stop_stress can signal its whole process group at once
             self.gpu_process = subprocess.Popen(['glmark2', '--duration', '60', '--fullscreen'], 
-                                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+                                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                                              start_new_session=True)
             print("GPU stress using glmark2")
         except Exception as e:
             print(f"GPU stress failed: {e}")
             # Fallback: simple GPU utilization
             try:
-                # Simple OpenCL test program
-                opencl_code = """
-                __kernel void stress_test(__global float* output) {
-                    int gid = get_global_id(0);
-                    float x = (float)gid;
-                    float result = 0.0f;
-                    
-                    for(int i = 0; i < 1000; i++) {
-                        result += sin(x + i) * cos(x - i);
-                    }
-                    output[gid] = result;
-                }
-                """
-                
-                # Write OpenCL code to temporary file
-                with open('/tmp/gpu_stress.cl', 'w') as f:
-                    f.write(opencl_code)
-                
-                # Run OpenCL stress test
-                opencl_test = """
-import pyopencl as cl
-import numpy as np
-
-# Create context and command queue
-ctx = cl.create_some_context()
-queue = cl.CommandQueue(ctx)
-
-# Read kernel
-with open('/tmp/gpu_stress.cl', 'r') as f:
-    kernel_src = f.read()
-
-# Compile program
-prg = cl.Program(ctx, kernel_src).build()
-
-# Create buffers
-size = 10000
-output = np.zeros(size, dtype=np.float32)
-output_buf = cl.Buffer(ctx, cl.mem_flags.WRITE_ONLY, output.nbytes)
-
-# Run kernel multiple times
-for i in range(100):
-    prg.stress_test(queue, (size,), None, output_buf)
-    queue.finish()
-    print(f"GPU iteration {i+1}/100")
-    time.sleep(0.1)
-"""
-                
-                # Write Python test to file
-                with open('/tmp/gpu_test.py', 'w') as f:
-                    f.write(opencl_test)
-                
-                # Run GPU test
-                self.gpu_process = subprocess.Popen(['python3', '/tmp/gpu_test.py'])
+                # Run OpenCL stress test on this (already background) thread
+                self.opencl_stress()
                 
             except Exception as e:
                 print(f"GPU stress not available: {e}")
     
+    def opencl_stress(self):
+        """GPU stress fallback - run an OpenCL kernel through pyopencl"""
+        if cl is None:
+            raise RuntimeError("pyopencl is not installed")
+        
+        # Create context and command queue
+        ctx = cl.create_some_context()
+        queue = cl.CommandQueue(ctx)
+        
+        # Building from source is slow on the Mali driver, so reuse the program
+        # binary saved by an earlier run when there is one
+        binary_path = '/tmp/gpu_stress.bin'
+        prg = None
+        if os.path.exists(binary_path):
+            try:
+                with open(binary_path, 'rb') as f:
+                    prg = cl.Program(ctx, ctx.devices[:1], [f.read()]).build()
+            except cl.Error:
+                prg = None  # Stale binary (e.g. driver update), rebuild below
+        
+        if prg is None:
+            # Compile program
+            prg = cl.Program(ctx, KERNEL_SRC).build()
+            with open(binary_path, 'wb') as f:
+                f.write(prg.binaries[0])
+        
+        # Look the kernel up once, prg.stress_test builds a new invoker per access
+        knl = prg.stress_test
+        
+        # Create buffers
+        size = 10000
+        output = np.zeros(size, dtype=np.float32)
+        output_buf = cl.Buffer(ctx, cl.mem_flags.WRITE_ONLY, output.nbytes)
+        
+        # Queue every run up front and wait once, so the GPU never idles on a
+        # host round-trip between kernels
+        for i in range(100):
+            knl(queue, (size,), None, output_buf)
+        queue.finish()
+        print("GPU iterations complete: 100/100")
+    
     def get_cpu_percentage(self):
         """Get CPU usage percentage"""
         try:
-            # Read CPU stats
-            with open('/proc/stat', 'r') as f:
-                lines = f.readlines()
-            
-            # Get first line (total CPU)
-            cpu_line = lines[0].split()[1:]
-            cpu_times = [int(x) for x in cpu_line]
+            # Only the aggregate "cpu" line is needed, which sits at the
+            # start of the file
+            raw = self.read_sensor(self.stat_fd, 256)
+            cpu_times = [int(x) for x in raw[:raw.index(b'\n')].split()[1:]]
             
             # Calculate total and idle time
             total_time = sum(cpu_times)
@@ -152,9 +249,23 @@ for i in range(100):
             
         except Exception as e:
             return 0.0
+    
+    def get_meminfo_value(self, raw, key):
+        """Extract a kB value for key (e.g. b'MemTotal:') from raw meminfo bytes"""
+        start = raw.index(key) + len(key)
+        return int(raw[start:raw.index(b'kB', start)])
+    
+    def get_memory_percentage(self):
+        """Get memory usage percentage from /proc/meminfo"""
+        # MemTotal and MemFree are the first two lines of meminfo
+        raw = self.read_sensor(self.meminfo_fd, 256)
+        total_mem = self.get_meminfo_value(raw, b'MemTotal:')
+        free_mem = self.get_meminfo_value(raw, b'MemFree:')
+        used_mem = total_mem - free_mem
+        return (used_mem / total_mem) * 100
 
-    def get_power_readings(self):
-        """Get real-time power readings from multiple sources"""
+    def get_power_readings(self, cpu_percent):
+        """Get real-time power readings, estimating current from cpu_percent"""
         power_info = {
             'voltage_input': 0,
             'current_input': 0,
@@ -166,9 +277,6 @@ for i in range(100):
             # Try to get actual current from system load estimation
             # Since hardware current sensors seem to show max values
             
-            # Get CPU usage for power estimation
-            cpu_percent = self.get_cpu_percentage()
-            
             # Base power consumption (idle)
             base_current = 0.6  # 600mA idle
             
@@ -178,9 +286,8 @@ for i in range(100):
             
             # Use actual voltage from power supply
             try:
-                with open('/sys/class/power_supply/tcpm-source-psy-4-0022/voltage_now', 'r') as f:
-                    voltage_uv = int(f.read().strip())
-                    power_info['voltage_input'] = voltage_uv / 1000000.0  # Convert μV to V
+                voltage_uv = int(self.read_sensor(self.voltage_fd))
+                power_info['voltage_input'] = voltage_uv / 1000000.0  # Convert μV to V
             except:
                 power_info['voltage_input'] = 5.0  # Default voltage
             
@@ -193,10 +300,58 @@ for i in range(100):
         
         return power_info
 
+    def record_sample(self, timestamp, *values):
+        """Append one monitor tick, metric values in SAMPLE_SCALES order"""
+        # Clamp so a bogus sensor reading cannot overflow the int16 column. Scale the
+        # whole row before appending any of it, so a bad value cannot leave the
+        # columns with different lengths
+        scaled = [max(-32768, min(32767, round(value * SAMPLE_SCALES[name])))
+                  for name, value in zip(SAMPLE_SCALES, values)]
+        self.samples['time'].append(timestamp)
+        for name, value in zip(SAMPLE_SCALES, scaled):
+            self.samples[name].append(value)
+    
+    def save_samples(self, path=SAMPLES_CSV):
+        """Write the recorded samples to a CSV file, one row per tick
+
+        Only call once the monitor thread has been joined (see stop_stress).
+        """
+        with open(path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(SAMPLE_COLUMNS)
+            scales = SAMPLE_SCALES.values()
+            for row in zip(*(self.samples[name] for name in SAMPLE_COLUMNS)):
+                writer.writerow(['%.3f' % row[0]] +
+                                ['%g' % (value / scale) for value, scale in zip(row[1:], scales)])
+    
+    def print_sample_summary(self):
+        """Print average and peak of the recorded samples, once the monitor thread has been joined"""
+        count = len(self.samples['time'])
+        if not count:
+            return
+        print(f"📈 Summary over {count} samples:")
+        for name, label, unit in (('cpu', 'CPU', '%'), ('gpu', 'GPU', '%'),
+                                  ('temp', 'Temperature', '°C'), ('power', 'Power', 'W')):
+            column = self.samples[name]
+            scale = SAMPLE_SCALES[name]
+            print(f"   {label}: avg {sum(column) / count / scale:.1f}{unit}, "
+                  f"peak {max(column) / scale:.1f}{unit}")
+    
+    def update_monitor_interval(self, cpu_percent, gpu_load):
+        """Adapt the monitor cadence to how much the load changed since the last tick"""
+        delta = max(abs(cpu_percent - self.prev_cpu_percent), abs(gpu_load - self.prev_gpu_load))
+        self.prev_cpu_percent = cpu_percent
+        self.prev_gpu_load = gpu_load
+        
+        if delta < MONITOR_STEADY_DELTA:
+            self.monitor_interval = min(MONITOR_MAX_INTERVAL, self.monitor_interval * 1.5)
+        else:
+            self.monitor_interval = MONITOR_MIN_INTERVAL
+    
     def monitor_system(self):
         """Monitor system resources and power"""
         print("Starting system monitoring")
-        while self.running:
+        while not self.stop_event.is_set():
             try:
                 # Get CPU percentage
                 cpu_percent = self.get_cpu_percentage()
@@ -205,51 +360,49 @@ for i in range(100):
                 gpu_load = self.get_gpu_load()
                 
                 # Get memory usage
-                with open('/proc/meminfo', 'r') as f:
-                    lines = f.readlines()
-                    total_mem = int(lines[0].split()[1])
-                    free_mem = int(lines[1].split()[1])
-                    used_mem = total_mem - free_mem
-                    mem_percent = (used_mem / total_mem) * 100
+                mem_percent = self.get_memory_percentage()
                 
                 # Get temperature
                 try:
-                    with open('/sys/class/thermal/thermal_zone0/temp', 'r') as f:
-                        temp = int(f.read().strip()) / 1000
+                    temp = int(self.read_sensor(self.temp_fd)) / 1000
                 except:
                     temp = 0
                 
                 # Get power readings
-                power_info = self.get_power_readings()
+                power_info = self.get_power_readings(cpu_percent)
+                
+                now = time.time()
+                self.record_sample(now, cpu_percent, gpu_load, mem_percent, temp,
+                                   power_info['voltage_input'], power_info['current_input'],
+                                   power_info['power_input'])
                 
                 # Display monitoring info
-                print(f"[{datetime.now().strftime('%H:%M:%S')}] "
-                      f"CPU: {cpu_percent:.1f}% | "
-                      f"GPU: {gpu_load}% | "
-                      f"RAM: {mem_percent:.1f}% | "
-                      f"Temp: {temp:.1f}°C | "
-                      f"Power: {power_info['voltage_input']:.2f}V, "
-                      f"{power_info['current_input']:.3f}A, "
-                      f"{power_info['power_input']:.2f}W "
-                      f"({power_info['power_source']})")
+                print(MONITOR_LINE % (time.strftime('%H:%M:%S', time.localtime(now)),
+                                      cpu_percent, gpu_load, mem_percent, temp,
+                                      power_info['voltage_input'], power_info['current_input'],
+                                      power_info['power_input'], power_info['power_source']))
                 
-                time.sleep(5)
+                self.update_monitor_interval(cpu_percent, gpu_load)
                 
             except Exception as e:
                 print(f"Monitoring error: {e}")
-                time.sleep(5)
+            
+            # Returns early when stop_stress sets the event
+            self.stop_event.wait(self.monitor_interval)
     
     def start_stress(self, duration=300):  # 5 minutes default
         """Start the stress test"""
         print(f"🚀 Starting Simple Stress Test (Duration: {duration}s)")
         print("=" * 50)
         
-        # Start CPU stress threads (4 threads for ~60% CPU)
-        for i in range(4):
-            thread = threading.Thread(target=self.cpu_stress, args=(i+1,))
-            thread.daemon = True
-            thread.start()
-            self.cpu_threads.append(thread)
+        # Start CPU stress processes (4 processes for ~60% CPU), one per
+        # big core so they run in parallel whatever the kernel does with the GIL
+        for i, cpu in enumerate(STRESS_CPUS):
+            process = multiprocessing.Process(target=cpu_stress_worker,
+                                              args=(i+1, cpu, self.stop_event))
+            process.daemon = True
+            process.start()
+            self.cpu_processes.append(process)
         
         # Start GPU stress
         gpu_thread = threading.Thread(target=self.gpu_stress)
@@ -257,9 +410,9 @@ for i in range(100):
         gpu_thread.start()
         
         # Start monitoring
-        monitor_thread = threading.Thread(target=self.monitor_system)
-        monitor_thread.daemon = True
-        monitor_thread.start()
+        self.monitor_thread = threading.Thread(target=self.monitor_system)
+        self.monitor_thread.daemon = True
+        self.monitor_thread.start()
         
         print("✅ All stress components started")
         print("📊 Monitoring system resources...")
@@ -268,7 +421,7 @@ for i in range(100):
         print("=" * 50)
         
         try:
-            time.sleep(duration)
+            self.stop_event.wait(duration)
         except KeyboardInterrupt:
             print("\n⚠️  Stopping stress test...")
         
@@ -277,26 +430,29 @@ for i in range(100):
     def stop_stress(self):
         """Stop the stress test"""
         print("🛑 Stopping stress test...")
-        self.running = False
+        self.stop_event.set()
+        
+        # The monitor reads the sensor fds and appends to the sample arrays;
+        # let its last tick finish before those are closed and dumped
+        if self.monitor_thread:
+            self.monitor_thread.join()
         
         # Stop GPU process
         if self.gpu_process:
             try:
-                self.gpu_process.terminate()
-                self.gpu_process.wait(timeout=5)
-            except:
-                self.gpu_process.kill()
+                os.killpg(self.gpu_process.pid, signal.SIGTERM)
+                self.gpu_process.wait(timeout=1)
+            except ProcessLookupError:
+                pass  # Already exited
+            except subprocess.TimeoutExpired:
+                os.killpg(self.gpu_process.pid, signal.SIGKILL)
+                self.gpu_process.wait()
         
-        # Wait for threads to finish
-        for thread in self.cpu_threads:
-            thread.join(timeout=2)
-        
-        # Cleanup temporary files
-        try:
-            os.remove('/tmp/gpu_stress.cl')
-            os.remove('/tmp/gpu_test.py')
-        except:
-            pass
+        # Wait for CPU stress processes to finish
+        for process in self.cpu_processes:
+            process.join(timeout=2)
+            if process.is_alive():
+                process.terminate()
         
         print("✅ Stress test stopped")
         print("📊 Final system status:")
@@ -307,24 +463,18 @@ for i in range(100):
             cpu_percent = self.get_cpu_percentage()
             print(f"   CPU Usage: {cpu_percent:.1f}%")
             
-            with open('/proc/meminfo', 'r') as f:
-                lines = f.readlines()
-                total_mem = int(lines[0].split()[1])
-                free_mem = int(lines[1].split()[1])
-                used_mem = total_mem - free_mem
-                mem_percent = (used_mem / total_mem) * 100
-                print(f"   Memory Usage: {mem_percent:.1f}%")
+            mem_percent = self.get_memory_percentage()
+            print(f"   Memory Usage: {mem_percent:.1f}%")
             
-            with open('/sys/class/thermal/thermal_zone0/temp', 'r') as f:
-                temp = int(f.read().strip()) / 1000
-                print(f"   Temperature: {temp:.1f}°C")
+            temp = int(self.read_sensor(self.temp_fd)) / 1000
+            print(f"   Temperature: {temp:.1f}°C")
             
             # Get final GPU load
             gpu_load = self.get_gpu_load()
             print(f"   GPU Load: {gpu_load}%")
             
             # Show final power status
-            power_info = self.get_power_readings()
+            power_info = self.get_power_readings(cpu_percent)
             print(f"   Power: {power_info['voltage_input']:.2f}V, "
                   f"{power_info['current_input']:.3f}A, "
                   f"{power_info['power_input']:.2f}W "
@@ -332,11 +482,21 @@ for i in range(100):
                 
         except Exception as e:
             print(f"   Error reading final status: {e}")
+        
+        self.close_sensors()
+        
+        self.print_sample_summary()
+        try:
+            self.save_samples()
+            print(f"💾 Samples saved to {SAMPLES_CSV}")
+        except OSError as e:
+            print(f"   Error saving samples: {e}")
 
 def signal_handler(signum, frame):
     """Handle Ctrl+C"""
     print("\n⚠️  Received interrupt signal")
-    sys.exit(0)
+    # Unwind into start_stress so stop_stress still runs
+    raise KeyboardInterrupt
 
 if __name__ == "__main__":
     # Set up signal handler
@@ -4,62 +4,174 @@ Voltage Stress Test for Rock 5B+
 Designed to force voltage intake to increase by maximizing CPU and GPU load
 """
 
-import time
 import threading
 import subprocess
 import os
 import signal
 import sys
+import errno
+import mmap
 from datetime import datetime
 import multiprocessing
 
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+def _burn(iterations):
+    """CPU stress kernel - chained floating point multiply/add loop"""
+    result = 0.0
+    for i in range(iterations):
+        # Each step depends on the previous result, so an optimising JIT
+        # cannot fold the loop into a closed-form sum or drop it. Do not
+        # simplify: this arithmetic is the stress workload itself
+        result = result * 0.9999999 + i * 3.14159e-7
+    return result
+
+# JIT-compile the kernel when numba is available: the loop then runs as
+# native floating point code instead of interpreter bytecode
+if njit is not None:
+    _burn = njit(nogil=True, fastmath=True, cache=True)(_burn)
+
+def parse_cpu_list(text):
+    """Parse a CPU list such as '4-7' or '4,5,6,7' into a set of CPU numbers"""
+    cpus = set()
+    for part in text.split(','):
+        if '-' in part:
+            first, last = part.split('-')
+            cpus.update(range(int(first), int(last) + 1))
+        elif part.strip():
+            cpus.add(int(part))
+    return cpus
+
+# RK3588 enumerates the Cortex-A76 big cores as CPUs 4-7 and the A55
+# LITTLE cores as 0-3. Stress runs on the big cores, the monitor on a
+# LITTLE one so it does not compete with the load it measures. Override
+# with YSUITE_BIG_CPUS / YSUITE_LITTLE_CPUS on other layouts
+def cpus_from_env(name, default):
+    """Parse a CPU list from the environment, falling back to the default if it is malformed"""
+    text = os.environ.get(name, default)
+    try:
+        return parse_cpu_list(text)
+    except ValueError:
+        print(f"⚠️  Invalid {name}={text!r}, using {default}")
+        return parse_cpu_list(default)
+
+BIG_CPUS = cpus_from_env('YSUITE_BIG_CPUS', '4-7')
+LITTLE_CPUS = cpus_from_env('YSUITE_LITTLE_CPUS', '0-3')
+
+def cpu_stress_process(process_id, cpu, stop_event):
+    """Maximum CPU stress - pure computation with no delays"""
+    # Ctrl+C is handled by the parent, which sets stop_event
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    try:
+        os.sched_setaffinity(0, {cpu})
+    except OSError:
+        pass  # Core not present, leave placement to the scheduler
+    print(f"🔥 CPU stress process {process_id} started on CPU {cpu}", flush=True)
+    while not stop_event.is_set():
+        # Maximum CPU stress - pure computation, no delays
+        _burn(10000000)  # 10M iterations between stop checks
+    print(f"CPU stress process {process_id} stopped")
+
+# Monitor lines are written out every MONITOR_FLUSH_EVERY samples
+# instead of one write per line
+MONITOR_FLUSH_EVERY = 5
+
+# File I/O fallback for the GPU stress: IO_STRESS_BLOCKS writes of
+# IO_STRESS_BLOCK_SIZE per second, the ~20MB/s the old dd loop wrote
+IO_STRESS_FILE = '/tmp/gpu_test'
+IO_STRESS_BLOCK_SIZE = 4 * 1024 * 1024
+IO_STRESS_BLOCKS = 5
+
+# Byte table adding 1 (mod 256), so a whole strided slice of a memory
+# block is updated with one translate() call
+_INCREMENT = bytes((i + 1) % 256 for i in range(256))
+
+def memory_stress_process(stop_event):
+    """Memory stress - hold ~1GB and keep touching it"""
+    # Ctrl+C is handled by the parent, which sets stop_event
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    memory_blocks = []
+    block_size = 100 * 1024 * 1024  # 100MB blocks
+    
+    try:
+        for i in range(10):  # Try to allocate 1GB
+            memory_blocks.append(bytearray(block_size))
+            if stop_event.wait(1):
+                return
+    except MemoryError:
+        pass  # Memory limit reached, continue with available memory
+    
+    # Keep memory allocated and perform operations on one byte per KB
+    while not stop_event.is_set():
+        for block in memory_blocks:
+            block[::1024] = block[::1024].translate(_INCREMENT)
+        stop_event.wait(0.1)
+
 class VoltageStressTest:
     def __init__(self):
-        self.running = True
+        # Single stop signal for everything: the forked workers share it,
+        # and the threads can sleep on it and wake as soon as it is set
+        self.stop_event = multiprocessing.Event()
         self.cpu_processes = []
         self.gpu_process = None
+        self.memory_process = None
+        self.io_thread = None
+        
+        # Compile the stress kernel before the workers fork, so each of
+        # them starts on native code instead of compiling its own copy
+        _burn(1)
+        
+        # Sensor files are opened once and re-read from offset 0 on every
+        # sample instead of being reopened each tick
+        self.voltage_fd = self.open_sensor('/sys/bus/iio/devices/iio:device0/in_voltage6_raw')
+        self.loadavg_fd = self.open_sensor('/proc/loadavg')
+        self.gpu_load_fd = self.open_sensor('/sys/class/devfreq/fb000000.gpu-mali/load')
+    
+    def open_sensor(self, path):
+        """Open a sensor file for repeated reads, -1 if unavailable"""
+        try:
+            return os.open(path, os.O_RDONLY)
+        except OSError:
+            return -1
+    
+    def read_sensor(self, fd, size=64):
+        """Re-read a cached sensor file from the start"""
+        return os.pread(fd, size, 0)
+    
+    def close_sensors(self):
+        """Close all cached sensor file descriptors"""
+        for name, fd in list(vars(self).items()):
+            if name.endswith('_fd') and fd >= 0:
+                os.close(fd)
+                setattr(self, name, -1)
         
     def get_voltage(self):
         """Get current voltage from ADC"""
         try:
-            with open('/sys/bus/iio/devices/iio:device0/in_voltage6_raw', 'r') as f:
-                adc_raw = int(f.read().strip())
-                voltage = adc_raw / 172.5
-                return round(voltage, 2)
+            adc_raw = int(self.read_sensor(self.voltage_fd))
+            voltage = adc_raw / 172.5
+            return round(voltage, 2)
         except:
             return 0
     
     def get_cpu_percentage(self):
         """Get CPU usage percentage"""
         try:
-            with open('/proc/loadavg', 'r') as f:
-                load = f.read().strip().split()[0]
-                return float(load)
+            load = self.read_sensor(self.loadavg_fd).split()[0]
+            return float(load)
         except:
             return 0
     
     def get_gpu_load(self):
         """Get GPU load"""
         try:
-            with open('/sys/class/devfreq/fb000000.gpu-mali/load', 'r') as f:
-                return int(f.read().strip())
+            return int(self.read_sensor(self.gpu_load_fd))
         except:
             return 0
     
-    def cpu_stress_process(self, process_id):
-        """Maximum CPU stress - pure computation with no delays"""
-        print(f"🔥 CPU stress process {process_id} started")
-        while self.running:
-            # Maximum CPU stress - pure computation
-            result = 0
-            for i in range(100000000):  # 100M iterations
-                result += i * i * 3.14159
-                # No delays - pure CPU stress
-                if i % 10000000 == 0:  # Check every 10M iterations
-                    if not self.running:
-                        break
-        print(f"CPU stress process {process_id} stopped")
-    
     def gpu_stress(self):
         """GPU stress using multiple methods"""
         print("🔥 Starting GPU stress")
@@ -78,85 +190,53 @@ class VoltageStressTest:
                 self.gpu_process = None
             
             # Method 2: File I/O stress (affects GPU indirectly)
-            try:
-                gpu_io_stress = """
-import time
-import subprocess
-import os
-
-# Create GPU stress using file operations and system calls
-for i in range(60):
-    try:
-        # Create and delete files rapidly
-        for j in range(100):
-            with open(f'/tmp/gpu_stress_{j}.tmp', 'w') as f:
-                f.write('GPU stress data' * 1000)
-            os.remove(f'/tmp/gpu_stress_{j}.tmp')
-        
-        # Use dd for I/O stress
-        subprocess.run(['dd', 'if=/dev/urandom', 'of=/tmp/gpu_test', 'bs=1M', 'count=20'], 
-                      capture_output=True, timeout=10)
-        subprocess.run(['rm', '-f', '/tmp/gpu_test'], capture_output=True)
-        
-        time.sleep(1)
-    except:
-        time.sleep(1)
-"""
-                with open('/tmp/gpu_io_stress.py', 'w') as f:
-                    f.write(gpu_io_stress)
-                
-                if not self.gpu_process:
-                    self.gpu_process = subprocess.Popen(['python3', '/tmp/gpu_io_stress.py'])
-                    print("GPU stress using file I/O method")
-                
-            except Exception as e:
-                print(f"Alternative GPU stress failed: {e}")
+            if not self.gpu_process:
+                self.io_thread = threading.Thread(target=self.io_stress)
+                self.io_thread.daemon = True
+                self.io_thread.start()
+                print("GPU stress using file I/O method")
                 
         except Exception as e:
             print(f"GPU stress failed: {e}")
     
+    def io_stress(self):
+        """File I/O stress - write straight to storage, bypassing the page cache"""
+        try:
+            # Anonymous mmap memory is page aligned, as O_DIRECT requires
+            buf = mmap.mmap(-1, IO_STRESS_BLOCK_SIZE)
+            buf.write(os.urandom(IO_STRESS_BLOCK_SIZE))
+            
+            flags = os.O_WRONLY | os.O_CREAT | os.O_TRUNC
+            try:
+                fd = os.open(IO_STRESS_FILE, flags | os.O_DIRECT, 0o600)
+            except OSError as e:
+                if e.errno != errno.EINVAL:
+                    raise
+                # Filesystem without O_DIRECT support (e.g. older tmpfs)
+                fd = os.open(IO_STRESS_FILE, flags, 0o600)
+        except OSError as e:
+            print(f"Alternative GPU stress failed: {e}")
+            return
+        
+        try:
+            while not self.stop_event.is_set():
+                for i in range(IO_STRESS_BLOCKS):
+                    os.pwrite(fd, buf, i * IO_STRESS_BLOCK_SIZE)
+                self.stop_event.wait(1)
+        except OSError as e:
+            print(f"Alternative GPU stress failed: {e}")
+        finally:
+            os.close(fd)
+            os.unlink(IO_STRESS_FILE)
+    
     def memory_stress(self):
         """Memory stress to increase power consumption"""
         print("🔥 Starting memory stress")
         try:
-            # Allocate large amounts of memory
-            memory_stress = """
-import time
-import gc
-
-# Allocate large amounts of memory
-memory_blocks = []
-block_size = 100 * 1024 * 1024  # 100MB blocks
-
-try:
-    for i in range(10):  # Try to allocate 1GB
-        block = bytearray(block_size)
-        memory_blocks.append(block)
-        print(f"Allocated {len(memory_blocks) * block_size // (1024*1024)}MB")
-        time.sleep(1)
-    
-    # Keep memory allocated and perform operations
-    while True:
-        for block in memory_blocks:
-            # Perform operations on memory
-            for j in range(0, len(block), 1024):
-                block[j] = (block[j] + 1) % 256
-        time.sleep(0.1)
-except MemoryError:
-    print("Memory limit reached")
-    # Continue with available memory
-    while True:
-        for block in memory_blocks:
-            for j in range(0, len(block), 1024):
-                block[j] = (block[j] + 1) % 256
-        time.sleep(0.1)
-"""
-            with open('/tmp/memory_stress.py', 'w') as f:
-                f.write(memory_stress)
-            
-            memory_process = subprocess.Popen(['python3', '/tmp/memory_stress.py'],
-                                            stdout=subprocess.DEVNULL,
-                                            stderr=subprocess.DEVNULL)
+            self.memory_process = multiprocessing.Process(target=memory_stress_process,
+                                                          args=(self.stop_event,))
+            self.memory_process.daemon = True
+            self.memory_process.start()
             print("Memory stress started")
             
         except Exception as e:
@@ -165,10 +245,16 @@ except MemoryError:
     def monitor_system(self):
         """Monitor system resources and voltage"""
         print("📊 Starting system monitoring")
+        try:
+            # Pins only this thread (pid 0 is the calling thread)
+            os.sched_setaffinity(0, LITTLE_CPUS)
+        except OSError:
+            pass  # No such cores, leave placement to the scheduler
         baseline_voltage = self.get_voltage()
         print(f"Baseline voltage: {baseline_voltage}V")
         
-        while self.running:
+        sample_count = 0
+        while not self.stop_event.is_set():
             try:
                 # Get current readings
                 voltage = self.get_voltage()
@@ -184,11 +270,15 @@ except MemoryError:
                       f"CPU Load: {cpu_load:.1f} | "
                       f"GPU Load: {gpu_load}%")
                 
-                time.sleep(2)
+                sample_count += 1
+                if sample_count % MONITOR_FLUSH_EVERY == 0:
+                    sys.stdout.flush()
                 
             except Exception as e:
                 print(f"Monitoring error: {e}")
-                time.sleep(2)
+            
+            # Returns early when stop_stress sets the event
+            self.stop_event.wait(2)
     
     def start_stress(self, duration=60):
         """Start the voltage stress test"""
@@ -198,12 +288,18 @@ except MemoryError:
         print("📈 Designed to increase voltage intake")
         print("=" * 60)
         
-        # Start CPU stress processes (one per core)
-        cpu_count = multiprocessing.cpu_count()
-        print(f"Starting {cpu_count} CPU stress processes...")
+        # Block-buffer stdout; the monitor flushes it in batches
+        sys.stdout.reconfigure(line_buffering=False)
         
-        for i in range(cpu_count):
-            process = multiprocessing.Process(target=self.cpu_stress_process, args=(i+1,))
+        # Start CPU stress processes (one per big core). Without any of the
+        # big cores, fall back to one per available core
+        available_cpus = os.sched_getaffinity(0)
+        stress_cpus = sorted(BIG_CPUS & available_cpus) or sorted(available_cpus)
+        print(f"Starting {len(stress_cpus)} CPU stress processes...")
+        
+        for i, cpu in enumerate(stress_cpus):
+            process = multiprocessing.Process(target=cpu_stress_process,
+                                              args=(i+1, cpu, self.stop_event))
             process.daemon = True
             process.start()
             self.cpu_processes.append(process)
@@ -228,9 +324,10 @@ except MemoryError:
         print("⏰ Test will run for", duration, "seconds")
         print("🛑 Press Ctrl+C to stop early")
         print("=" * 60)
+        sys.stdout.flush()
         
         try:
-            time.sleep(duration)
+            self.stop_event.wait(duration)
         except KeyboardInterrupt:
             print("\n⚠️  Stopping stress test...")
         
@@ -239,7 +336,7 @@ except MemoryError:
     def stop_stress(self):
         """Stop the stress test"""
         print("🛑 Stopping stress test...")
-        self.running = False
+        self.stop_event.set()
         
         # Stop GPU process
         if self.gpu_process:
@@ -249,20 +346,21 @@ except MemoryError:
             except:
                 self.gpu_process.kill()
         
-        # Stop CPU processes
+        # Stop memory process
+        if self.memory_process:
+            self.memory_process.join(timeout=2)
+            if self.memory_process.is_alive():
+                self.memory_process.terminate()
+        
+        # Wait for CPU processes to finish their current batch
         for process in self.cpu_processes:
-            try:
+            process.join(timeout=2)
+            if process.is_alive():
                 process.terminate()
-                process.join(timeout=2)
-            except:
-                process.kill()
         
-        # Cleanup temporary files
-        try:
-            os.remove('/tmp/gpu_io_stress.py')
-            os.remove('/tmp/memory_stress.py')
-        except:
-            pass
+        # Let the I/O stress thread remove its file
+        if self.io_thread:
+            self.io_thread.join(timeout=2)
         
         print("✅ Stress test stopped")
         print("📊 Final voltage reading:")
@@ -273,11 +371,15 @@ except MemoryError:
             print(f"   Final Voltage: {final_voltage}V")
         except Exception as e:
             print(f"   Error reading final voltage: {e}")
+        
+        self.close_sensors()
+        sys.stdout.flush()
 
 def signal_handler(signum, frame):
     """Handle Ctrl+C"""
     print("\n⚠️  Received interrupt signal")
-    sys.exit(0)
+    # Unwind into start_stress so stop_stress still runs
+    raise KeyboardInterrupt
 
 if __name__ == "__main__":
     # Set up signal handler
@@ -5,6 +5,7 @@ Monitors CPU and RAM usage and triggers system reboot if either exceeds 80% for
 """
 
 import psutil
+import os
 import time
 import subprocess
 import logging
@@ -20,6 +21,22 @@ logging.basicConfig(
     ]
 )
 
+# Run on the Cortex-A55 LITTLE cores (CPUs 0-3 on RK3588), away from the
+# big cores a stress load saturates. Override with YSUITE_LITTLE_CPUS,
+# e.g. "0-3" or "0,1"
+WATCHDOG_CPUS = os.environ.get('YSUITE_LITTLE_CPUS', '0-3')
+
+def parse_cpu_list(text):
+    """Parse a CPU list such as '0-3' or '0,1,2,3' into a set of CPU numbers"""
+    cpus = set()
+    for part in text.split(','):
+        if '-' in part:
+            first, last = part.split('-')
+            cpus.update(range(int(first), int(last) + 1))
+        elif part.strip():
+            cpus.add(int(part))
+    return cpus
+
 class WatchdogMonitor:
     def __init__(self, cpu_threshold=80, ram_threshold=80, duration_threshold=15):
         self.cpu_threshold = cpu_threshold
@@ -27,20 +44,29 @@ class WatchdogMonitor:
         self.duration_threshold = duration_threshold
         self.cpu_high_start = None
         self.ram_high_start = None
-        self.last_log_time = 0
+        # Monotonic timestamps, so wall-clock steps (NTP, RTC sync at boot)
+        # cannot stretch or shrink a high-usage period
+        self.last_log_time = float('-inf')
+        
+        # Thresholds are fixed, so their message prefixes are built once
+        self.cpu_exceeded_msg = f"CPU usage exceeded {cpu_threshold}%"
+        self.ram_exceeded_msg = f"RAM usage exceeded {ram_threshold}%"
+        
+        # Prime psutil's CPU counters; each later call then reports usage
+        # since the previous one without blocking
+        psutil.cpu_percent(interval=None)
         
     def get_cpu_usage(self):
-        """Get current CPU usage percentage"""
-        return psutil.cpu_percent(interval=1)
+        """Get CPU usage percentage since the previous call"""
+        return psutil.cpu_percent(interval=None)
     
     def get_ram_usage(self):
         """Get current RAM usage percentage"""
         memory = psutil.virtual_memory()
         return memory.percent
     
-    def log_status(self, cpu_usage, ram_usage, cpu_duration=None, ram_duration=None):
+    def log_status(self, current_time, cpu_usage, ram_usage, cpu_duration=None, ram_duration=None):
         """Log current status"""
-        current_time = time.time()
         if current_time - self.last_log_time >= 5:  # Log every 5 seconds max
             status_msg = f"CPU: {cpu_usage:.1f}%, RAM: {ram_usage:.1f}%"
             if cpu_duration:
@@ -54,17 +80,17 @@ class WatchdogMonitor:
         """Check CPU and RAM usage and trigger reboot if needed"""
         cpu_usage = self.get_cpu_usage()
         ram_usage = self.get_ram_usage()
-        current_time = time.time()
+        current_time = time.monotonic()
         
         # Check CPU usage
         if cpu_usage > self.cpu_threshold:
             if self.cpu_high_start is None:
                 self.cpu_high_start = current_time
-                logging.warning(f"CPU usage exceeded {self.cpu_threshold}%: {cpu_usage:.1f}%")
+                logging.warning(f"{self.cpu_exceeded_msg}: {cpu_usage:.1f}%")
             else:
                 cpu_duration = current_time - self.cpu_high_start
                 if cpu_duration >= self.duration_threshold:
-                    logging.critical(f"CPU usage exceeded {self.cpu_threshold}% for {cpu_duration:.1f} seconds. Triggering reboot!")
+                    logging.critical(f"{self.cpu_exceeded_msg} for {cpu_duration:.1f} seconds. Triggering reboot!")
                     self.trigger_reboot("CPU usage exceeded threshold")
                     return
         else:
@@ -76,11 +102,11 @@ class WatchdogMonitor:
         if ram_usage > self.ram_threshold:
             if self.ram_high_start is None:
                 self.ram_high_start = current_time
-                logging.warning(f"RAM usage exceeded {self.ram_threshold}%: {ram_usage:.1f}%")
+                logging.warning(f"{self.ram_exceeded_msg}: {ram_usage:.1f}%")
             else:
                 ram_duration = current_time - self.ram_high_start
                 if ram_duration >= self.duration_threshold:
-                    logging.critical(f"RAM usage exceeded {self.ram_threshold}% for {ram_duration:.1f} seconds. Triggering reboot!")
+                    logging.critical(f"{self.ram_exceeded_msg} for {ram_duration:.1f} seconds. Triggering reboot!")
                     self.trigger_reboot("RAM usage exceeded threshold")
                     return
         else:
@@ -96,7 +122,7 @@ class WatchdogMonitor:
         if self.ram_high_start:
             ram_duration = current_time - self.ram_high_start
         
-        self.log_status(cpu_usage, ram_usage, cpu_duration, ram_duration)
+        self.log_status(current_time, cpu_usage, ram_usage, cpu_duration, ram_duration)
     
     def trigger_reboot(self, reason):
         """Trigger system reboot"""
@@ -113,12 +139,17 @@ class WatchdogMonitor:
     def run(self):
         """Main monitoring loop"""
         logging.info("Watchdog Monitor started")
+        try:
+            os.sched_setaffinity(0, parse_cpu_list(WATCHDOG_CPUS))
+        except (OSError, ValueError) as e:
+            logging.warning(f"Could not pin to CPUs {WATCHDOG_CPUS}: {e}")
         logging.info(f"Thresholds: CPU={self.cpu_threshold}%, RAM={self.ram_threshold}%, Duration={self.duration_threshold}s")
         
         try:
             while True:
-                self.check_and_trigger()
+                # Sleep first so every CPU reading covers a full second
                 time.sleep(1)  # Check every second
+                self.check_and_trigger()
         except KeyboardInterrupt:
             logging.info("Watchdog Monitor stopped by user")
         except Exception as e:
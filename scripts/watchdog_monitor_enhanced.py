@@ -6,24 +6,63 @@ Monitors CPU, RAM usage and WiFi connectivity
 - Restarts USB ports and network adapters if WiFi unavailable for 60 seconds
 """
 
-import psutil
 import time
 import subprocess
 import logging
+import logging.handlers
 import os
 import glob
+import signal
+import socket
+import struct
 from datetime import datetime
 
 # Configure logging
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+LOG_FLUSH_INTERVAL = 30  # seconds between forced flushes of buffered INFO records
+
+# Buffer routine INFO records in memory to spare the eMMC/SD card; warnings and the
+# reboot triggers flush the buffer straight away
+_log_file_handler = logging.FileHandler('/var/log/watchdog_monitor.log', delay=True)
+_log_file_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+log_buffer = logging.handlers.MemoryHandler(capacity=64, flushLevel=logging.WARNING,
+                                            target=_log_file_handler)
+
 logging.basicConfig(
     level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
+    format=LOG_FORMAT,
     handlers=[
-        logging.FileHandler('/var/log/watchdog_monitor.log'),
+        log_buffer,
         logging.StreamHandler()
     ]
 )
 
+# ICMP echo request (type 8); the kernel fills in the id and checksum on ping sockets
+ICMP_ECHO_REQUEST = struct.pack('!BBHHH', 8, 0, 0, 0, 1)
+ICMP_ECHO_REPLY = 0
+PING_TIMEOUT = 1
+
+# WiFi interface names (wlan0, wlp1s0, wlx...) all start with 'wl'
+_WIFI_PREFIX = ('wl',)
+
+# USB interface classes of modems (02, Communications) and WiFi/Bluetooth adapters (e0, Wireless Controller)
+USB_NETWORK_CLASSES = ('02', 'e0')
+USB_DEVICES_PATH = '/sys/bus/usb/devices'
+USB_UNBIND_TIMEOUT = 0.5  # seconds to wait for the driver to let go of a device
+
+def write_sysfs(path, value):
+    """Write a value to a sysfs attribute with a single write(2)"""
+    fd = os.open(path, os.O_WRONLY)
+    try:
+        os.write(fd, value.encode())
+    finally:
+        os.close(fd)
+
+def sigterm_handler(signum, frame):
+    """Handle SIGTERM from systemd stopping or restarting the service"""
+    # Unwind out of run() so its finally flushes the buffered log records
+    raise SystemExit(0)
+
 class EnhancedWatchdogMonitor:
     def __init__(self, cpu_threshold=80, ram_threshold=80, duration_threshold=15, wifi_timeout=60):
         self.cpu_threshold = cpu_threshold
@@ -33,157 +72,224 @@ class EnhancedWatchdogMonitor:
         self.cpu_high_start = None
         self.ram_high_start = None
         self.wifi_down_start = None
-        self.last_log_time = 0
+        # (name, threshold, attribute holding the time it went high) for each rebooting metric
+        self._metrics = (
+            ('CPU', cpu_threshold, 'cpu_high_start'),
+            ('RAM', ram_threshold, 'ram_high_start'),
+        )
+        self.last_log_time = float('-inf')
+        # WiFi interfaces rarely change, so rescan them at most once a minute
+        self._wifi_iface_cache = None
+        self._wifi_iface_cache_ts = 0
+        # Unprivileged ICMP needs net.ipv4.ping_group_range; fall back to TCP once it is refused
+        self._icmp_allowed = True
+        # Default gateways change rarely, so reparse the route table at most every 30 seconds
+        self._gateway_cache = {}
+        self._gateway_cache_ts = float('-inf')
+        # Kept open for the monitor's lifetime; procfs regenerates it on every pread at offset 0
+        self._meminfo_fd = os.open('/proc/meminfo', os.O_RDONLY)
+        # Prime the CPU counters so _sample_system can diff against them without blocking
+        self._prev_cpu_total = 0
+        self._prev_cpu_idle = 0
+        self._sample_system()
         
-    def get_cpu_usage(self):
-        """Get current CPU usage percentage"""
-        return psutil.cpu_percent(interval=1)
+    def _get_wifi_interfaces(self):
+        """Get WiFi interface names, cached for 60 seconds"""
+        current_time = time.monotonic()
+        if self._wifi_iface_cache is None or current_time - self._wifi_iface_cache_ts > 60:
+            self._wifi_iface_cache = tuple(
+                name for _, name in socket.if_nameindex()
+                if name.startswith(_WIFI_PREFIX)
+            )
+            self._wifi_iface_cache_ts = current_time
+        return self._wifi_iface_cache
     
-    def get_ram_usage(self):
-        """Get current RAM usage percentage"""
-        memory = psutil.virtual_memory()
-        return memory.percent
+    def _sample_system(self):
+        """Get CPU and RAM usage percentages from /proc/stat and /proc/meminfo"""
+        with open('/proc/stat', 'rb') as f:
+            # user nice system idle iowait irq softirq steal (guest time is already in user/nice)
+            times = [int(x) for x in f.readline().split()[1:9]]
+        total = sum(times)
+        idle = times[3] + times[4]
+        total_delta = total - self._prev_cpu_total
+        idle_delta = idle - self._prev_cpu_idle
+        self._prev_cpu_total = total
+        self._prev_cpu_idle = idle
+        cpu_usage = 100.0 * (total_delta - idle_delta) / total_delta if total_delta else 0.0
+        
+        # MemTotal and MemAvailable are the first and third lines, well within 1 KiB
+        meminfo = os.pread(self._meminfo_fd, 1024, 0)
+        mem_total = int(meminfo[meminfo.index(b'MemTotal:') + 9:].split(None, 1)[0])
+        mem_available = int(meminfo[meminfo.index(b'MemAvailable:') + 13:].split(None, 1)[0])
+        ram_usage = 100.0 * (mem_total - mem_available) / mem_total
+        
+        return cpu_usage, ram_usage
     
     def check_wifi_connectivity(self):
         """Check if WiFi is connected and working"""
         try:
             # Check for WiFi interfaces
-            wifi_interfaces = []
-            for interface in psutil.net_if_addrs():
-                if interface.startswith('wl') or interface.startswith('wlan'):
-                    wifi_interfaces.append(interface)
+            wifi_interfaces = self._get_wifi_interfaces()
             
             if not wifi_interfaces:
+                # A USB dongle may still be enumerating; rescan on the next check
+                self._wifi_iface_cache = None
                 return False
             
-            # Test connectivity with ping
+            # Test connectivity by probing each interface's default gateway
+            current_time = time.monotonic()
+            if current_time - self._gateway_cache_ts >= 30:
+                self._gateway_cache = self._get_default_gateways()
+                self._gateway_cache_ts = current_time
             for interface in wifi_interfaces:
-                try:
-                    # Get gateway for this interface
-                    result = subprocess.run(['ip', 'route', 'show', 'dev', interface], 
-                                          capture_output=True, text=True, timeout=2)
-                    if result.returncode == 0 and 'default' in result.stdout:
-                        # Try to ping gateway
-                        gateway = result.stdout.split()[2]
-                        ping_result = subprocess.run(['ping', '-c', '1', '-W', '3', gateway], 
-                                                   capture_output=True, timeout=5)
-                        if ping_result.returncode == 0:
-                            return True
-                except:
-                    continue
+                gateway = self._gateway_cache.get(interface)
+                if gateway and self._probe_gateway(gateway):
+                    return True
             
+            # The interfaces or route may have changed; rescan both on the next check before trusting the caches again
+            self._wifi_iface_cache = None
+            self._gateway_cache_ts = float('-inf')
+            return False
+        except OSError:
             return False
-        except:
+    
+    def _get_default_gateways(self):
+        """Get the default gateway of each interface from /proc/net/route"""
+        gateways = {}
+        with open('/proc/net/route') as f:
+            next(f)  # header
+            for line in f:
+                fields = line.split()
+                if fields[1] == '00000000' and fields[2] != '00000000':
+                    # Gateway is a little-endian hex IPv4 address
+                    gateways.setdefault(fields[0], socket.inet_ntoa(struct.pack('<I', int(fields[2], 16))))
+        return gateways
+    
+    def _probe_gateway(self, gateway):
+        """Check that the gateway answers, without spawning ping"""
+        if self._icmp_allowed:
+            try:
+                with socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_ICMP) as sock:
+                    sock.settimeout(PING_TIMEOUT)
+                    sock.sendto(ICMP_ECHO_REQUEST, (gateway, 0))
+                    return sock.recv(64)[0] == ICMP_ECHO_REPLY
+            except PermissionError:
+                self._icmp_allowed = False
+            except OSError:
+                return False
+        
+        # A TCP connect to the DNS port needs no privileges; a refusal still means the gateway is up
+        try:
+            socket.create_connection((gateway, 53), timeout=PING_TIMEOUT).close()
+            return True
+        except ConnectionRefusedError:
+            return True
+        except OSError:
             return False
     
+    def _find_usb_network_devices(self):
+        """Find USB modems and WiFi adapters by their interface class in sysfs"""
+        devices = []
+        for device_path in glob.glob(f"{USB_DEVICES_PATH}/*/driver"):
+            device = device_path.split('/')[-2]
+            if ':' in device:  # an interface of a device, not the device itself
+                continue
+            for class_path in glob.glob(f"{USB_DEVICES_PATH}/{device}/{device}:*/bInterfaceClass"):
+                with open(class_path) as f:
+                    if f.read().strip() in USB_NETWORK_CLASSES:
+                        devices.append(device)
+                        break
+        return devices
+    
     def restart_modem_usb(self):
         """Restart USB ports and network adapters"""
         try:
             logging.warning("WiFi connectivity lost. Restarting USB ports and network adapters...")
             
-            # Find USB devices
-            usb_devices = []
-            try:
-                result = subprocess.run(['lsusb'], capture_output=True, text=True, timeout=5)
-                if result.returncode == 0:
-                    for line in result.stdout.split('\n'):
-                        if 'modem' in line.lower() or 'network' in line.lower() or 'wifi' in line.lower():
-                            usb_devices.append(line.split()[5])
-            except:
-                pass
-            
             # Unbind and rebind USB devices
-            for device in usb_devices:
+            for device in self._find_usb_network_devices():
                 try:
-                    # Find device in sysfs
-                    device_path = f"/sys/bus/usb/devices/{device}"
-                    if os.path.exists(device_path):
-                        # Unbind
-                        with open(f"{device_path}/driver/unbind", 'w') as f:
-                            f.write(device)
-                        time.sleep(2)
-                        # Rebind
-                        with open(f"{device_path}/driver/bind", 'w') as f:
-                            f.write(device)
-                        logging.info(f"Restarted USB device: {device}")
-                except:
+                    # The driver link disappears on unbind, so resolve it first
+                    driver_link = f"{USB_DEVICES_PATH}/{device}/driver"
+                    driver_path = os.path.realpath(driver_link)
+                    # Unbind, then wait for the link to go rather than sleeping a fixed time
+                    write_sysfs(f"{driver_path}/unbind", device)
+                    deadline = time.monotonic() + USB_UNBIND_TIMEOUT
+                    while os.path.lexists(driver_link) and time.monotonic() < deadline:
+                        time.sleep(0.01)
+                    # Rebind
+                    write_sysfs(f"{driver_path}/bind", device)
+                    logging.info("Restarted USB device: %s", device)
+                except OSError:
                     continue
             
             # Restart network interfaces
             try:
-                wifi_interfaces = []
-                for interface in psutil.net_if_addrs():
-                    if interface.startswith('wl') or interface.startswith('wlan'):
-                        wifi_interfaces.append(interface)
-                
-                for interface in wifi_interfaces:
+                for interface in self._get_wifi_interfaces():
                     try:
                         subprocess.run(['ip', 'link', 'set', interface, 'down'], timeout=5)
                         time.sleep(2)
                         subprocess.run(['ip', 'link', 'set', interface, 'up'], timeout=5)
-                        logging.info(f"Restarted network interface: {interface}")
-                    except:
+                        logging.info("Restarted network interface: %s", interface)
+                    except (OSError, subprocess.SubprocessError):
                         continue
-            except:
+            except OSError:
                 pass
             
+            # Interfaces may have been renamed or re-enumerated by the restart
+            self._wifi_iface_cache = None
+            
             logging.info("USB ports and network adapters restart completed")
             
         except Exception as e:
-            logging.error(f"Error restarting USB/network: {e}")
+            logging.error("Error restarting USB/network: %s", e)
     
     def log_status(self, cpu_usage, ram_usage, wifi_status, cpu_duration=None, ram_duration=None, wifi_duration=None):
         """Log current status"""
-        current_time = time.time()
-        if current_time - self.last_log_time >= 5:  # Log every 5 seconds max
-            status_msg = f"CPU: {cpu_usage:.1f}%, RAM: {ram_usage:.1f}%, WiFi: {'OK' if wifi_status else 'DOWN'}"
-            if cpu_duration:
-                status_msg += f" (CPU high for {cpu_duration:.1f}s)"
-            if ram_duration:
-                status_msg += f" (RAM high for {ram_duration:.1f}s)"
-            if wifi_duration:
-                status_msg += f" (WiFi down for {wifi_duration:.1f}s)"
-            logging.info(status_msg)
-            self.last_log_time = current_time
+        # logging only interpolates the arguments once a handler accepts the record,
+        # so pass every number through %-placeholders rather than formatting here
+        msg = "CPU: %.1f%%, RAM: %.1f%%, WiFi: %s"
+        args = [cpu_usage, ram_usage, 'OK' if wifi_status else 'DOWN']
+        for suffix, duration in ((" (CPU high for %.1fs)", cpu_duration),
+                                 (" (RAM high for %.1fs)", ram_duration),
+                                 (" (WiFi down for %.1fs)", wifi_duration)):
+            if duration:
+                msg += suffix
+                args.append(duration)
+        logging.info(msg, *args)
+    
+    def _update_threshold(self, name, usage, threshold, attr, now):
+        """Track how long a metric has been above its threshold; returns that duration or None"""
+        high_start = getattr(self, attr)
+        if usage > threshold:
+            if high_start is None:
+                setattr(self, attr, now)
+                logging.warning("%s usage exceeded %s%%: %.1f%%", name, threshold, usage)
+                return 0.0
+            return now - high_start
+        if high_start is not None:
+            logging.info("%s usage returned to normal: %.1f%%", name, usage)
+            setattr(self, attr, None)
+        return None
     
     def check_and_trigger(self):
         """Check CPU, RAM, and WiFi and trigger actions if needed"""
-        cpu_usage = self.get_cpu_usage()
-        ram_usage = self.get_ram_usage()
+        cpu_usage, ram_usage = self._sample_system()
         wifi_status = self.check_wifi_connectivity()
-        current_time = time.time()
+        # Monotonic, so an NTP step at boot can't fake or hide a threshold duration
+        current_time = time.monotonic()
         
-        # Check CPU usage
-        if cpu_usage > self.cpu_threshold:
-            if self.cpu_high_start is None:
-                self.cpu_high_start = current_time
-                logging.warning(f"CPU usage exceeded {self.cpu_threshold}%: {cpu_usage:.1f}%")
-            else:
-                cpu_duration = current_time - self.cpu_high_start
-                if cpu_duration >= self.duration_threshold:
-                    logging.critical(f"CPU usage exceeded {self.cpu_threshold}% for {cpu_duration:.1f} seconds. Triggering reboot!")
-                    self.trigger_reboot("CPU usage exceeded threshold")
-                    return
-        else:
-            if self.cpu_high_start is not None:
-                logging.info(f"CPU usage returned to normal: {cpu_usage:.1f}%")
-                self.cpu_high_start = None
-        
-        # Check RAM usage
-        if ram_usage > self.ram_threshold:
-            if self.ram_high_start is None:
-                self.ram_high_start = current_time
-                logging.warning(f"RAM usage exceeded {self.ram_threshold}%: {ram_usage:.1f}%")
-            else:
-                ram_duration = current_time - self.ram_high_start
-                if ram_duration >= self.duration_threshold:
-                    logging.critical(f"RAM usage exceeded {self.ram_threshold}% for {ram_duration:.1f} seconds. Triggering reboot!")
-                    self.trigger_reboot("RAM usage exceeded threshold")
-                    return
-        else:
-            if self.ram_high_start is not None:
-                logging.info(f"RAM usage returned to normal: {ram_usage:.1f}%")
-                self.ram_high_start = None
+        # Check CPU and RAM usage; reboot for the first one that stayed high too long
+        exceeded = None
+        for (name, threshold, attr), usage in zip(self._metrics, (cpu_usage, ram_usage)):
+            duration = self._update_threshold(name, usage, threshold, attr, current_time)
+            if exceeded is None and duration is not None and duration >= self.duration_threshold:
+                exceeded = (name, threshold, duration)
+        if exceeded is not None:
+            name, threshold, duration = exceeded
+            logging.critical("%s usage exceeded %s%% for %.1f seconds. Triggering reboot!", name, threshold, duration)
+            self.trigger_reboot(f"{name} usage exceeded threshold")
+            return
         
         # Check WiFi connectivity
         if not wifi_status:
@@ -193,7 +299,7 @@ class EnhancedWatchdogMonitor:
             else:
                 wifi_duration = current_time - self.wifi_down_start
                 if wifi_duration >= self.wifi_timeout:
-                    logging.critical(f"WiFi unavailable for {wifi_duration:.1f} seconds. Restarting USB/network!")
+                    logging.critical("WiFi unavailable for %.1f seconds. Restarting USB/network!", wifi_duration)
                     self.restart_modem_usb()
                     self.wifi_down_start = None  # Reset timer
                     return
@@ -202,6 +308,11 @@ class EnhancedWatchdogMonitor:
                 logging.info("WiFi connectivity restored")
                 self.wifi_down_start = None
         
+        # Log every 5 seconds max; skip building the status line in between
+        if current_time - self.last_log_time < 5:
+            return
+        self.last_log_time = current_time
+        
         # Calculate durations for logging
         cpu_duration = None
         ram_duration = None
@@ -217,7 +328,7 @@ class EnhancedWatchdogMonitor:
     
     def trigger_reboot(self, reason):
         """Trigger system reboot"""
-        logging.critical(f"WATCHDOG TRIGGERED: {reason}")
+        logging.critical("WATCHDOG TRIGGERED: %s", reason)
         logging.critical("System will reboot in 5 seconds...")
         
         # Write to syslog
@@ -230,17 +341,38 @@ class EnhancedWatchdogMonitor:
     def run(self):
         """Main monitoring loop"""
         logging.info("Enhanced Watchdog Monitor started")
-        logging.info(f"Thresholds: CPU={self.cpu_threshold}%, RAM={self.ram_threshold}%, Duration={self.duration_threshold}s, WiFi Timeout={self.wifi_timeout}s")
+        logging.info("Thresholds: CPU=%s%%, RAM=%s%%, Duration=%ss, WiFi Timeout=%ss",
+                     self.cpu_threshold, self.ram_threshold, self.duration_threshold, self.wifi_timeout)
         
+        signal.signal(signal.SIGTERM, sigterm_handler)
+        
+        # Pace against a monotonic deadline so the time spent checking doesn't stretch each cycle
+        next_check = last_flush_time = time.monotonic()
         try:
             while True:
                 self.check_and_trigger()
-                time.sleep(1)  # Check every second
+                current_time = time.monotonic()
+                if current_time - last_flush_time >= LOG_FLUSH_INTERVAL:
+                    log_buffer.flush()
+                    last_flush_time = current_time
+                next_check += 1  # Check every second
+                sleep_for = next_check - time.monotonic()
+                if sleep_for > 0:
+                    time.sleep(sleep_for)
+                else:
+                    # A slow cycle (e.g. a USB restart) overran; carry on from now rather than bursting to catch up
+                    next_check = time.monotonic()
         except KeyboardInterrupt:
             logging.info("Enhanced Watchdog Monitor stopped by user")
+        except SystemExit:
+            logging.info("Enhanced Watchdog Monitor stopped by SIGTERM")
+            raise
         except Exception as e:
-            logging.error(f"Enhanced Watchdog Monitor error: {e}")
+            logging.error("Enhanced Watchdog Monitor error: %s", e)
             raise
+        finally:
+            os.close(self._meminfo_fd)
+            log_buffer.flush()
 
 if __name__ == "__main__":
     monitor = EnhancedWatchdogMonitor(
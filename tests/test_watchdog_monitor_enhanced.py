@@ -0,0 +1,48 @@
+import os
+import signal
+import subprocess
+import sys
+import time
+
+SCRIPTS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'scripts')
+
+# Run the monitor with its buffered file handler pointed at a temporary log
+RUN_MONITOR = """
+import logging, sys
+sys.path.insert(0, {scripts!r})
+import watchdog_monitor_enhanced as w
+handler = logging.FileHandler({log!r})
+handler.setFormatter(logging.Formatter(w.LOG_FORMAT))
+w.log_buffer.setTarget(handler)
+w.EnhancedWatchdogMonitor().run()
+"""
+
+
+def test_sigterm_flushes_buffered_log_records(tmp_path):
+    log_path = tmp_path / 'watchdog_monitor.log'
+    proc = subprocess.Popen(
+        [sys.executable, '-c', RUN_MONITOR.format(scripts=SCRIPTS_DIR, log=str(log_path))],
+        stderr=subprocess.PIPE, text=True,
+    )
+    try:
+        # The first status line is INFO, so it sits in the MemoryHandler until flushed
+        deadline = time.monotonic() + 10
+        status_line = None
+        while time.monotonic() < deadline:
+            line = proc.stderr.readline()
+            if ' - INFO - CPU: ' in line:
+                status_line = line.strip()
+                break
+        assert status_line is not None, "monitor never logged a status line"
+
+        proc.send_signal(signal.SIGTERM)
+        assert proc.wait(timeout=10) == 0
+    finally:
+        if proc.poll() is None:
+            proc.kill()
+            proc.wait()
+        proc.stderr.close()
+
+    log = log_path.read_text()
+    assert status_line in log
+    assert 'stopped by SIGTERM' in log
@@ -6,19 +6,13 @@ A comprehensive Python implementation using exact system monitoring methods
 
 import os
 import sys
-import json
 import time
 import subprocess
-import threading
-import signal
-import argparse
 from datetime import datetime
 from pathlib import Path
 import shutil
-import platform
 import re
 import glob
-from typing import Dict, List, Tuple, Optional
 
 # Global configuration
 SUITE_VERSION = "3.1.0"
@@ -40,6 +34,7 @@ class Colors:
     BOLD = '\033[1m'
     UNDERLINE = '\033[4m'
     END = '\033[0m'
+    CLEAR = '\033[H\033[2J'
 
 class YSuite:
     def __init__(self):
@@ -68,6 +63,7 @@ class YTop:
         self.gpuLoadPath = ""
         self.npuLoadPath = ""
         self.fanLoadPath = ""
+        self.voltageAdcPath = "/sys/bus/iio/devices/iio:device0/in_voltage6_raw"
         
         # CPU stats
         self.prevStats = []
@@ -79,6 +75,9 @@ class YTop:
         self.findNPULoadPath()
         self.nrCPUs = self.getNumberOfCores()
         
+        # Keep the ADC channel open; it is re-read with pread every refresh
+        self.voltageAdcFd = self.openVoltageADC()
+        
         # Initialize CPU stats arrays
         self.prevStats = [[] for _ in range(self.nrCPUs)]
         self.currStats = [[] for _ in range(self.nrCPUs)]
@@ -375,19 +374,29 @@ class YTop:
         except:
             return 0.0
     
+    def openVoltageADC(self):
+        """Open the input voltage ADC channel, -1 if unavailable"""
+        try:
+            return os.open(self.voltageAdcPath, os.O_RDONLY)
+        except OSError:
+            return -1
+    
+    def readVoltageADC(self):
+        """Read input voltage from the ADC - exact system method"""
+        # Same result as: awk '{printf ("%0.2f\n",$1/172.5); }' /sys/bus/iio/devices/iio:device0/in_voltage6_raw
+        # without spawning awk for every sample
+        if self.voltageAdcFd < 0:
+            return None
+        try:
+            raw = int(os.pread(self.voltageAdcFd, 32, 0))
+        except (OSError, ValueError):
+            return None
+        return round(raw / 172.5, 2)
+    
     def get_voltage_reading(self):
         """Get voltage reading using the exact method specified"""
-        try:
-            # Use the exact method: awk '{printf ("%0.2f\n",$1/172.5); }' /sys/bus/iio/devices/iio:device0/in_voltage6_raw
-            result = subprocess.run(['awk', '{printf ("%0.2f\\n",$1/172.5); }', '/sys/bus/iio/devices/iio:device0/in_voltage6_raw'],
-                                  capture_output=True, text=True, timeout=2)
-            
-            if result.returncode == 0:
-                return float(result.stdout.strip())
-            else:
-                return 0.0
-        except Exception as e:
-            return 0.0
+        voltage = self.readVoltageADC()
+        return voltage if voltage is not None else 0.0
     
     def updateSoCName(self):
         """Update SoC name - exact system method"""
@@ -499,12 +508,8 @@ class YTop:
     def get_accurate_power_readings(self):
         """Get accurate power readings using the exact method specified"""
         try:
-            # Use the exact method: awk '{printf ("%0.2f\n",$1/172.5); }' /sys/bus/iio/devices/iio:device0/in_voltage6_raw
-            result = subprocess.run(['awk', '{printf ("%0.2f\\n",$1/172.5); }', '/sys/bus/iio/devices/iio:device0/in_voltage6_raw'],
-                                  capture_output=True, text=True, timeout=2)
-            
-            if result.returncode == 0:
-                voltage_input = float(result.stdout.strip())
+            voltage_input = self.readVoltageADC()
+            if voltage_input is not None:
                 power_source = "ADC Channel 6 (Exact Method)"
             else:
                 voltage_input = 0
@@ -582,8 +587,8 @@ class YTop:
         """Display comprehensive system statistics"""
         while self.running:
             try:
-                # Clear screen
-                os.system('clear')
+                # Clear screen (escape sequence, no shell + clear per frame)
+                print(Colors.CLEAR, end='')
                 
                 # Read all system information using exact methods
                 cpuLoad = self.readCPULoad()
@@ -756,6 +761,9 @@ class YPower:
         print("=" * 50)
         
         try:
+            # Samples are scheduled on the monotonic clock so the time spent
+            # reading sensors does not stretch the 1s period
+            next_sample = time.monotonic()
             while True:
                 # Get power information
                 power_info = self.ytop.get_accurate_power_readings()
@@ -777,7 +785,13 @@ class YPower:
                 # Clear line and display power info
                 print(f"\r{Colors.GREEN}Voltage: {voltage:.2f}V | Current: {current:.2f}A | Power: {power:.2f}W | Source: {power_source}{Colors.END}", end='', flush=True)
                 
-                time.sleep(1)
+                next_sample += 1
+                delay = next_sample - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                else:
+                    # Fell behind, resynchronise instead of bursting samples
+                    next_sample = time.monotonic()
                 
         except KeyboardInterrupt:
             print(f"\n{Colors.GREEN}Power monitoring stopped.{Colors.END}")
@@ -818,6 +832,17 @@ class YLog:
     def __init__(self):
         self.log_file = LOG_DIR / "system.log"
     
+    def print_log_line(self, line):
+        """Print a log line color coded by level"""
+        if "ERROR" in line:
+            print(f"{Colors.RED}{line}{Colors.END}")
+        elif "WARNING" in line:
+            print(f"{Colors.YELLOW}{line}{Colors.END}")
+        elif "INFO" in line:
+            print(f"{Colors.GREEN}{line}{Colors.END}")
+        else:
+            print(line)
+    
     def monitor_logs(self):
         """Monitor system logs in real-time"""
         print(f"{Colors.BOLD}{Colors.CYAN}System Log Monitoring - {SUITE_NAME} v{SUITE_VERSION}{Colors.END}")
@@ -830,23 +855,27 @@ class YLog:
                 ['journalctl', '-f', '--no-pager'],
                 stdout=subprocess.PIPE,
                 stderr=subprocess.PIPE,
-                text=True
+                bufsize=0
             )
             
+            # Take everything journalctl has queued in one read and split it
+            # into lines, instead of one readline() call per log line
+            fd = process.stdout.fileno()
+            pending = b''
             while True:
-                line = process.stdout.readline()
-                if not line:
+                chunk = os.read(fd, 65536)
+                if not chunk:
                     break
                 
-                # Color code different log levels
-                if "ERROR" in line:
-                    print(f"{Colors.RED}{line.strip()}{Colors.END}")
-                elif "WARNING" in line:
-                    print(f"{Colors.YELLOW}{line.strip()}{Colors.END}")
-                elif "INFO" in line:
-                    print(f"{Colors.GREEN}{line.strip()}{Colors.END}")
-                else:
-                    print(line.strip())
+                lines = (pending + chunk).split(b'\n')
+                pending = lines.pop()
+                # Strip the raw bytes so each line is decoded once, with no
+                # extra str copy from stripping after the decode
+                for line in lines:
+                    self.print_log_line(line.strip().decode('utf-8', 'replace'))
+            
+            if pending:
+                self.print_log_line(pending.strip().decode('utf-8', 'replace'))
                 
         except KeyboardInterrupt:
             print(f"\n{Colors.GREEN}Log monitoring stopped.{Colors.END}")